@@ -0,0 +1,126 @@
+"""
+Бенчмарк времени старта API
+Измеряет время от запуска процесса uvicorn до ответа /health
+(модель загружена и прогрета) и до первого предсказания.
+
+Запуск: python benchmark_startup.py [--runs N]
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+project_root = os.path.dirname(os.path.abspath(__file__))
+REPORT_PATH = os.path.join(project_root, 'reports', 'startup_benchmark.txt')
+
+TARGET_SECONDS = 1.0  # цель: /health с прогретой моделью быстрее секунды
+TIMEOUT_SECONDS = 60.0
+SAMPLE_REQUEST = {"feature1": 0.5, "feature2": 1.0, "feature3": -0.3, "feature4": 0.8}
+
+def free_port():
+    """Свободный локальный порт"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def request(url, payload=None):
+    """HTTP-запрос, возвращает код ответа"""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def measure_once():
+    """Один запуск сервера: время до /health и до первого предсказания"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'src.api:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=project_root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            if time.perf_counter() - started > TIMEOUT_SECONDS:
+                raise RuntimeError("API не ответил на /health")
+            if process.poll() is not None:
+                raise RuntimeError("Процесс API завершился при старте")
+            try:
+                if request(f"{base_url}/health") == 200:
+                    break
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.01)
+        health = time.perf_counter() - started
+
+        before_predict = time.perf_counter()
+        status = request(f"{base_url}/predict", SAMPLE_REQUEST)
+        first_predict = time.perf_counter() - before_predict
+        if status != 200:
+            raise RuntimeError(f"/predict вернул код {status}")
+    finally:
+        process.terminate()
+        process.wait()
+
+    return {
+        'health': health,
+        'first_predict': first_predict,
+        'time_to_first_prediction': health + first_predict,
+    }
+
+def measure_import():
+    """Время импорта src.api в отдельном процессе (без загрузки модели)"""
+    code = "import time; t = time.perf_counter(); import src.api; print(time.perf_counter() - t)"
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=project_root, text=True)
+    return float(output.strip().splitlines()[-1])
+
+def main():
+    """Основная функция бенчмарка"""
+    runs = int(sys.argv[sys.argv.index('--runs') + 1]) if '--runs' in sys.argv else 3
+
+    print("=" * 50)
+    print("БЕНЧМАРК ВРЕМЕНИ СТАРТА API")
+    print("=" * 50)
+
+    import_time = measure_import()
+    results = []
+    for i in range(runs):
+        result = measure_once()
+        results.append(result)
+        print(f"Запуск {i + 1}: /health {result['health']:.3f} с, "
+              f"первое предсказание {result['first_predict'] * 1000:.1f} мс")
+
+    health = statistics.median(r['health'] for r in results)
+    first_predict = statistics.median(r['first_predict'] for r in results)
+    ttfp = statistics.median(r['time_to_first_prediction'] for r in results)
+    status = "✅ достигнута" if health < TARGET_SECONDS else "❌ не достигнута"
+
+    report = f"""БЕНЧМАРК ВРЕМЕНИ СТАРТА API
+{'='*40}
+
+Запусков: {runs} (медианные значения)
+Импорт src.api: {import_time:.3f} с
+Время до ответа /health (модель прогрета): {health:.3f} с
+Первое предсказание: {first_predict * 1000:.1f} мс
+Время до первого предсказания: {ttfp:.3f} с
+Цель /health < {TARGET_SECONDS:.1f} с: {status}
+"""
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, 'w', encoding='utf-8') as f:
+        f.write(report)
+
+    print("\n" + report)
+    print(f"✅ Результаты сохранены: {REPORT_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@
 import os
 import sys
 
+from src import profiling
+
 def run_module_a():
     """Запуск модуля A: Предобработка данных"""
     print("🚀 Запуск модуля A...")
@@ -25,6 +27,12 @@ def main():
     print("ЗАПУСК ВСЕХ МОДУЛЕЙ ML ПРОЕКТА")
     print("=" * 60)
     
+    # Режим профилирования: переменная окружения наследуется модулями
+    if '--profile' in sys.argv:
+        profiling.enable()
+    if profiling.is_enabled():
+        print("⏱️  Профилирование включено, результаты: reports/profiles/")
+    
     # Запуск модулей A, B, C последовательно
     run_module_a()
     run_module_b() 
@@ -37,6 +45,8 @@ def main():
     print("1. Запустите веб-приложение: streamlit run src/app.py")
     print("2. Или запустите API: python src/api.py")
     print("3. Проверьте результаты в папке reports/")
+    if profiling.is_enabled():
+        print("4. Профили этапов: reports/profiles/*_summary.txt")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,20 +1,25 @@
 """
 API интерфейс для модели (дополнительно к Streamlit)
 Простая реализация с FastAPI
+
+Тяжелые библиотеки (joblib, sklearn) импортируются лениво
+при загрузке модели, а не при импорте модуля.
 """
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-import joblib
-import pandas as pd
 import numpy as np
+import json
 import os
 import sys
+import time
 
 # Добавляем корень проекта в sys.path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 os.chdir(project_root)  # Меняем рабочую директорию на корень проекта
 
+from src import monitoring, profiling, serving
+
 # Создание FastAPI приложения
 app = FastAPI(title="ML API", description="API для предсказаний модели")
 
@@ -29,21 +34,110 @@ class PredictionResponse(BaseModel):
     prediction: int
     probability: list
     class_probabilities: dict
+    model: str = "primary"
 
-# Глобальная переменная для модели
+# Признаки модели
+FEATURES = ["feature1", "feature2", "feature3", "feature4"]
+
+# Глобальная переменная для модели (основная модель реестра)
 model = None
 
+# Реестр моделей для A/B и теневого обслуживания
+registry = None
+
+# Время загрузки и прогрева модели (секунды)
+startup_stats = {}
+
+# Монитор дрейфа входных признаков
+drift_monitor = None
+
+# Профайлер запросов (создается только в режиме профилирования)
+request_profiler = None
+
+async def profile_requests(request, call_next):
+    """Профилирование выборки запросов"""
+    if not request_profiler.should_sample():
+        return await call_next(request)
+    with profiling.SamplingProfiler(interval=request_profiler.interval) as profiler:
+        response = await call_next(request)
+    # Роутер кладет обработчик в scope — по нему отбираются стеки запроса
+    request_profiler.record(request.url.path, profiler, request.scope.get("endpoint"))
+    return response
+
+def enable_request_profiling():
+    """Подключение middleware профилирования запросов"""
+    global request_profiler
+    if request_profiler is not None:
+        return
+    request_profiler = profiling.RequestProfiler().start()
+    app.middleware("http")(profile_requests)
+    app.on_event("shutdown")(request_profiler.stop)
+    print(f"⏱️  Профилирование запросов включено (доля: {request_profiler.sample_rate})")
+
+if profiling.is_enabled():
+    enable_request_profiling()
+
+def make_input_array(rows):
+    """Массив признаков в порядке обучения (без построения DataFrame)"""
+    return np.asarray(rows, dtype=float)
+
+def warm_up(loaded_model):
+    """Прогрев модели: первое предсказание на нулевом векторе"""
+    serving.score(loaded_model, make_input_array([[0.0] * len(FEATURES)]))
+
 @app.on_event("startup")
 async def load_model():
-    """Загрузка модели при старте приложения"""
-    global model
-    try:
-        model_path = os.path.join(project_root, 'models', 'model.pkl')
-        model = joblib.load(model_path)
-        print("✅ Модель загружена успешно")
-    except FileNotFoundError:
+    """Загрузка и прогрев моделей при старте приложения"""
+    global model, registry
+    started = time.perf_counter()
+    registry = serving.ModelRegistry.from_config(features=FEATURES)
+    loaded = time.perf_counter()
+    model = registry.models.get(registry.default)
+    if model is None:
         print("❌ Модель не найдена!")
-        model = None
+        return
+    for loaded_model in registry.models.values():
+        serving.check_feature_order(loaded_model, FEATURES)
+        warm_up(loaded_model)
+    startup_stats["model_load_seconds"] = round(loaded - started, 3)
+    startup_stats["warmup_seconds"] = round(time.perf_counter() - loaded, 3)
+    print(f"✅ Модель загружена успешно ({startup_stats['model_load_seconds']} с, "
+          f"прогрев {startup_stats['warmup_seconds']} с)")
+    if len(registry.models) > 1:
+        print(f"✅ Моделей в обслуживании: {len(registry.models)}, теневых: {len(registry.shadows)}")
+
+@app.on_event("shutdown")
+async def close_registry():
+    """Дожидаемся теневых предсказаний и закрываем лог"""
+    if registry is not None:
+        registry.close()
+
+def load_results():
+    """Результаты обучения из JSON, который пишет модуль C"""
+    try:
+        results_path = os.path.join(project_root, 'reports', 'model_results.json')
+        with open(results_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+@app.on_event("startup")
+async def start_drift_monitor():
+    """Запуск мониторинга дрейфа по бинам, сохраненным модулем C"""
+    global drift_monitor
+    reference = load_results().get("drift_reference")
+    if reference is None:
+        print("⚠️  Эталонные распределения не найдены, мониторинг дрейфа отключен")
+        drift_monitor = None
+        return
+    drift_monitor = monitoring.DriftMonitor.from_reference(reference).start()
+    print("✅ Мониторинг дрейфа запущен")
+
+@app.on_event("shutdown")
+async def stop_drift_monitor():
+    """Остановка фонового потока мониторинга"""
+    if drift_monitor is not None:
+        drift_monitor.stop()
 
 @app.get("/")
 async def root():
@@ -55,7 +149,7 @@ async def health_check():
     """Проверка здоровья сервиса"""
     if model is None:
         raise HTTPException(status_code=503, detail="Модель не загружена")
-    return {"status": "healthy", "model_loaded": True}
+    return {"status": "healthy", "model_loaded": True, "startup": startup_stats}
 
 @app.post("/predict", response_model=PredictionResponse)
 async def predict(request: PredictionRequest):
@@ -63,18 +157,22 @@ async def predict(request: PredictionRequest):
     if model is None:
         raise HTTPException(status_code=503, detail="Модель не загружена")
     
+    # Учет входных значений в мониторинге дрейфа
+    if drift_monitor is not None:
+        drift_monitor.observe((request.feature1, request.feature2, request.feature3, request.feature4))
+    
     try:
         # Подготовка данных
-        input_data = pd.DataFrame([{
-            'feature1': request.feature1,
-            'feature2': request.feature2,
-            'feature3': request.feature3,
-            'feature4': request.feature4
-        }])
+        input_data = make_input_array([[
+            request.feature1,
+            request.feature2,
+            request.feature3,
+            request.feature4
+        ]])
         
-        # Предсказание
-        prediction = int(model.predict(input_data)[0])
-        probability = model.predict_proba(input_data)[0].tolist()
+        # Предсказание выбранной моделью; теневые модели считаются в фоне
+        model_name = registry.choose()
+        prediction, probability = registry.predict(model_name, input_data)
         
         # Формирование ответа
         response = PredictionResponse(
@@ -83,7 +181,8 @@ async def predict(request: PredictionRequest):
             class_probabilities={
                 "class_0": probability[0],
                 "class_1": probability[1]
-            }
+            },
+            model=model_name
         )
         
         return response
@@ -97,24 +196,39 @@ async def model_info():
     if model is None:
         raise HTTPException(status_code=503, detail="Модель не загружена")
     
-    try:
-        # Попытка загрузить информацию о модели
-        results_path = os.path.join(project_root, 'reports', 'model_results.txt')
-        with open(results_path, 'r', encoding='utf-8') as f:
-            results = f.read()
-            accuracy_line = [line for line in results.split('\n') 
-                           if 'Точность на тестовой выборке:' in line]
-            accuracy = accuracy_line[0].split(': ')[1] if accuracy_line else "Неизвестно"
-    except FileNotFoundError:
-        accuracy = "Неизвестно"
+    results = load_results()
+    
+    accuracy = results.get("test_accuracy")
+    cross_validation = results.get("cross_validation") or {}
     
     return {
-        "model_type": "RandomForestClassifier",
-        "parameters": {"n_estimators": 100, "random_state": 42},
-        "accuracy": accuracy,
-        "features": ["feature1", "feature2", "feature3", "feature4"]
+        "model_type": results.get("model_type", "RandomForestClassifier"),
+        "parameters": results.get("parameters", {"n_estimators": 100, "random_state": 42}),
+        "accuracy": round(accuracy, 3) if accuracy is not None else "Неизвестно",
+        "cross_validation": {
+            "n_splits": cross_validation.get("n_splits"),
+            "metrics": cross_validation.get("metrics", {})
+        },
+        "features": FEATURES
     }
 
+@app.get("/models")
+async def models_status():
+    """Маршрутизация трафика, задержки и совпадения по моделям"""
+    if registry is None:
+        raise HTTPException(status_code=503, detail="Модель не загружена")
+    return registry.summary()
+
+@app.get("/monitoring/drift")
+async def drift_status():
+    """Метрики дрейфа входных признаков (PSI, KS) по скользящему окну"""
+    if drift_monitor is None:
+        raise HTTPException(status_code=503, detail="Мониторинг дрейфа не запущен")
+    return drift_monitor.latest
+
 if __name__ == "__main__":
     import uvicorn
+    if '--profile' in sys.argv:
+        profiling.enable()
+        enable_request_profiling()
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -107,4 +107,5 @@ def main():
     print("\n✅ Модуль A завершен успешно!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    from profiling import run_profiled
+    run_profiled("module_a", main)
@@ -1,11 +1,12 @@
 """
 Модуль B: Разведочный анализ данных
 Простая реализация с базовыми визуализациями
+
+matplotlib и seaborn импортируются только при построении графиков.
 """
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
 
 def load_data(filepath):
     """Загрузка очищенных данных"""
@@ -37,6 +38,9 @@ def basic_statistics(df):
 
 def create_visualizations(df, output_path):
     """Создание базовых визуализаций"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    
     plt.style.use('default')
     fig, axes = plt.subplots(2, 2, figsize=(15, 12))
     fig.suptitle('Разведочный анализ данных', fontsize=16)
@@ -149,8 +153,9 @@ def main():
     # 2. Базовая статистика
     basic_statistics(df)
     
-    # 3. Визуализации
-    create_visualizations(df, plots_path)
+    # 3. Визуализации (пропускаются с флагом --stats-only)
+    if '--stats-only' not in sys.argv:
+        create_visualizations(df, plots_path)
     
     # 4. Генерация выводов
     conclusions = generate_conclusions(df, conclusions_path)
@@ -165,4 +170,5 @@ def main():
     print("\n✅ Модуль B завершен успешно!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    from profiling import run_profiled
+    run_profiled("module_b", main)
@@ -1,13 +1,21 @@
 """
 Модуль C: Построение и обучение модели
 Простая реализация с RandomForestClassifier
+
+sklearn и joblib импортируются при обучении и сохранении модели.
 """
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report
-import joblib
+import numpy as np
+import json
 import os
+import time
+
+from monitoring import compute_reference
+
+# Параметры модели и кросс-валидации
+MODEL_PARAMS = {"n_estimators": 100, "random_state": 42}
+CV_FOLDS = 5
+CALIBRATION_BINS = 10
 
 def load_data(filepath):
     """Загрузка очищенных данных"""
@@ -38,6 +46,10 @@ def prepare_features(df):
 
 def train_model(X, y):
     """Обучение модели"""
+    from sklearn.model_selection import train_test_split
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, classification_report
+    
     # Разделение на train/test
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42, stratify=y
@@ -47,20 +59,17 @@ def train_model(X, y):
     print(f"Тестовая выборка: {X_test.shape}")
     
     # Создание и обучение модели
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model = RandomForestClassifier(**MODEL_PARAMS)
     print("🔄 Обучение модели...")
     model.fit(X_train, y_train)
     
-    # Предсказания
-    y_pred_train = model.predict(X_train)
-    y_pred_test = model.predict(X_test)
+    # Предсказания: один проход predict_proba по тестовой выборке
+    y_pred_test = model.classes_[model.predict_proba(X_test).argmax(axis=1)]
     
     # Оценка качества
-    train_accuracy = accuracy_score(y_train, y_pred_train)
     test_accuracy = accuracy_score(y_test, y_pred_test)
     
     print(f"\n📊 Результаты обучения:")
-    print(f"Точность на обучении: {train_accuracy:.3f}")
     print(f"Точность на тесте: {test_accuracy:.3f}")
     
     # Подробный отчет
@@ -78,21 +87,131 @@ def train_model(X, y):
     
     return model, test_accuracy, feature_importance
 
+def calibration_summary(y_true, proba, n_bins=CALIBRATION_BINS):
+    """Калибровка: кривая по равным бинам вероятности и ECE"""
+    bins = np.minimum((proba * n_bins).astype(int), n_bins - 1)
+    curve = []
+    ece = 0.0
+    for b in range(n_bins):
+        mask = bins == b
+        count = int(mask.sum())
+        if count == 0:
+            continue
+        mean_predicted = float(proba[mask].mean())
+        fraction_positive = float(y_true[mask].mean())
+        ece += count / len(proba) * abs(fraction_positive - mean_predicted)
+        curve.append({
+            "bin": b,
+            "count": count,
+            "mean_predicted": mean_predicted,
+            "fraction_positive": fraction_positive
+        })
+    return {"ece": ece, "curve": curve}
+
+def evaluate_fold(X, y, fold, train_idx, test_idx):
+    """Обучение и оценка модели на одном фолде"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, roc_auc_score, log_loss, brier_score_loss
+    
+    X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+    y_train, y_test = y.iloc[train_idx].to_numpy(), y.iloc[test_idx].to_numpy()
+    
+    model = RandomForestClassifier(**MODEL_PARAMS)
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+    
+    # Все метрики считаются по одному вызову predict_proba
+    started = time.perf_counter()
+    proba = model.predict_proba(X_test)
+    predict_seconds = time.perf_counter() - started
+    
+    y_pred = model.classes_[proba.argmax(axis=1)]
+    positive = proba[:, 1]
+    
+    return {
+        "fold": fold,
+        "train_size": len(train_idx),
+        "test_size": len(test_idx),
+        "accuracy": accuracy_score(y_test, y_pred),
+        "roc_auc": roc_auc_score(y_test, positive),
+        "log_loss": log_loss(y_test, proba, labels=model.classes_),
+        "brier": brier_score_loss(y_test, positive),
+        "ece": calibration_summary(y_test, positive)["ece"],
+        "fit_seconds": fit_seconds,
+        "predict_seconds": predict_seconds,
+        "test_idx": test_idx,
+        "proba": positive
+    }
+
+def evaluate_model(X, y, n_splits=CV_FOLDS, n_jobs=-1):
+    """Стратифицированная k-fold кросс-валидация, фолды считаются параллельно"""
+    from sklearn.model_selection import StratifiedKFold
+    from joblib import Parallel, delayed
+    
+    print(f"\n🔄 Кросс-валидация: {n_splits} фолдов...")
+    cv = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=MODEL_PARAMS["random_state"])
+    started = time.perf_counter()
+    folds = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_fold)(X, y, fold, train_idx, test_idx)
+        for fold, (train_idx, test_idx) in enumerate(cv.split(X, y))
+    )
+    total_seconds = time.perf_counter() - started
+    
+    # Out-of-fold вероятности для общей кривой калибровки
+    oof_proba = np.empty(len(y))
+    for fold in folds:
+        oof_proba[fold.pop("test_idx")] = fold.pop("proba")
+    
+    metric_names = ["accuracy", "roc_auc", "log_loss", "brier", "ece", "fit_seconds", "predict_seconds"]
+    summary = {
+        name: {
+            "mean": float(np.mean([f[name] for f in folds])),
+            "std": float(np.std([f[name] for f in folds]))
+        }
+        for name in metric_names
+    }
+    folds = [{k: (float(v) if isinstance(v, (float, np.floating)) else v) for k, v in f.items()} for f in folds]
+    
+    print(f"📊 Результаты кросс-валидации ({total_seconds:.2f} с):")
+    for name in ["accuracy", "roc_auc", "log_loss", "brier", "ece"]:
+        print(f"{name}: {summary[name]['mean']:.3f} ± {summary[name]['std']:.3f}")
+    
+    return {
+        "n_splits": n_splits,
+        "total_seconds": total_seconds,
+        "metrics": summary,
+        "folds": folds,
+        "calibration": calibration_summary(y.to_numpy(), oof_proba)
+    }
+
 def save_model(model, filepath):
     """Сохранение обученной модели"""
+    import joblib
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
     joblib.dump(model, filepath)
     print(f"✅ Модель сохранена: {filepath}")
 
-def save_results(accuracy, feature_importance, filepath):
+def save_results(accuracy, feature_importance, filepath, cv_results=None):
     """Сохранение результатов обучения"""
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
     
+    cv_text = ""
+    if cv_results is not None:
+        metrics = cv_results["metrics"]
+        cv_text = f"""
+КРОСС-ВАЛИДАЦИЯ ({cv_results['n_splits']} фолдов):
+{'-'*30}
+""" + "".join(
+            f"{name}: {metrics[name]['mean']:.3f} ± {metrics[name]['std']:.3f}\n"
+            for name in ["accuracy", "roc_auc", "log_loss", "brier", "ece"]
+        )
+    
     results = f"""РЕЗУЛЬТАТЫ ОБУЧЕНИЯ МОДЕЛИ
 {'='*40}
 
 Алгоритм: RandomForestClassifier
-Параметры: n_estimators=100, random_state=42
+Параметры: {', '.join(f'{k}={v}' for k, v in MODEL_PARAMS.items())}
 Точность на тестовой выборке: {accuracy:.3f}
 
 ВАЖНОСТЬ ПРИЗНАКОВ:
@@ -102,13 +221,33 @@ def save_results(accuracy, feature_importance, filepath):
 ОЦЕНКА КАЧЕСТВА:
 {'-'*20}
 Accuracy: {accuracy:.3f} ({accuracy*100:.1f}%)
-"""
+{cv_text}"""
     
     with open(filepath, 'w', encoding='utf-8') as f:
         f.write(results)
     
     print(f"✅ Результаты сохранены: {filepath}")
 
+def save_results_json(accuracy, feature_importance, cv_results, drift_reference, filepath):
+    """Сохранение результатов обучения в JSON (читается API)"""
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    
+    results = {
+        "model_type": "RandomForestClassifier",
+        "parameters": MODEL_PARAMS,
+        "test_accuracy": float(accuracy),
+        "feature_importance": {
+            row.feature: float(row.importance) for row in feature_importance.itertuples()
+        },
+        "cross_validation": cv_results,
+        "drift_reference": drift_reference
+    }
+    
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    
+    print(f"✅ Результаты (JSON) сохранены: {filepath}")
+
 def main():
     """Основная функция модуля C"""
     print("=" * 50)
@@ -121,6 +260,7 @@ def main():
     input_path = os.path.join(project_root, 'data', 'cleaned', 'cleaned_data.csv')
     model_path = os.path.join(project_root, 'models', 'model.pkl')
     results_path = os.path.join(project_root, 'reports', 'model_results.txt')
+    results_json_path = os.path.join(project_root, 'reports', 'model_results.json')
     
     # 1. Загрузка данных
     df = load_data(input_path)
@@ -135,11 +275,16 @@ def main():
     # 3. Обучение модели
     model, accuracy, feature_importance = train_model(X, y)
     
-    # 4. Сохранение модели
+    # 4. Кросс-валидация
+    cv_results = evaluate_model(X, y)
+    
+    # 5. Сохранение модели
     save_model(model, model_path)
     
-    # 5. Сохранение результатов
-    save_results(accuracy, feature_importance, results_path)
+    # 6. Сохранение результатов
+    save_results(accuracy, feature_importance, results_path, cv_results)
+    drift_reference = compute_reference(X, list(X.columns))
+    save_results_json(accuracy, feature_importance, cv_results, drift_reference, results_json_path)
     
     print("\n" + "=" * 30)
     print("ФИНАЛЬНЫЕ РЕЗУЛЬТАТЫ:")
@@ -151,4 +296,5 @@ def main():
     print("\n✅ Модуль C завершен успешно!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    from profiling import run_profiled
+    run_profiled("module_c", main)
@@ -0,0 +1,196 @@
+"""
+Мониторинг дрейфа входных признаков API
+Фиксированная память: гистограммы по квантилям обучающих данных
+в скользящем окне из кольцевого буфера временных корзин.
+
+На пути запроса — только поиск бина (bisect) и инкремент счетчика.
+PSI и KS по окну считаются фоновым потоком раз в ML_DRIFT_INTERVAL секунд.
+Бины и эталонные доли считает модуль C (compute_reference) и сохраняет
+в reports/model_results.json; API только читает их при старте.
+NaN и ±inf не попадают в гистограмму и считаются отдельно.
+"""
+import math
+import os
+import threading
+import time
+from bisect import bisect_right
+
+# Переменные окружения
+WINDOW_ENV = 'ML_DRIFT_WINDOW_SECONDS'
+BUCKETS_ENV = 'ML_DRIFT_BUCKETS'
+INTERVAL_ENV = 'ML_DRIFT_INTERVAL'
+
+# Значения по умолчанию
+DEFAULT_WINDOW_SECONDS = 600.0
+DEFAULT_BUCKETS = 10
+DEFAULT_INTERVAL = 30.0
+N_BINS = 10
+
+# Пороги PSI: < 0.1 — стабильно, < 0.25 — умеренный сдвиг, иначе дрейф
+PSI_WARNING = 0.1
+PSI_DRIFT = 0.25
+MIN_OBSERVATIONS = 200
+EPSILON = 1e-4  # сглаживание пустых бинов для PSI
+
+def _float_env(name, default):
+    """Чтение числового параметра из переменной окружения"""
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+def psi(expected, actual):
+    """Population Stability Index между двумя распределениями по бинам"""
+    score = 0.0
+    for e, a in zip(expected, actual):
+        e = max(e, EPSILON)
+        a = max(a, EPSILON)
+        score += (a - e) * math.log(a / e)
+    return score
+
+def ks_statistic(expected, actual):
+    """KS-статистика по бинированным CDF"""
+    cdf_expected = cdf_actual = 0.0
+    statistic = 0.0
+    for e, a in zip(expected, actual):
+        cdf_expected += e
+        cdf_actual += a
+        statistic = max(statistic, abs(cdf_actual - cdf_expected))
+    return statistic
+
+def psi_status(score):
+    """Текстовый статус по значению PSI"""
+    if score < PSI_WARNING:
+        return "stable"
+    if score < PSI_DRIFT:
+        return "warning"
+    return "drift"
+
+def compute_reference(df, features, n_bins=N_BINS):
+    """Бины по квантилям обучающей выборки и эталонные доли по бинам"""
+    edges = []
+    reference = []
+    for col in features:
+        values = sorted(v for v in df[col].tolist() if math.isfinite(v))
+        quantiles = [values[int(len(values) * q / n_bins)] for q in range(1, n_bins)]
+        # Повторяющиеся квантили схлопываются, чтобы бины не были пустыми
+        col_edges = sorted(set(quantiles))
+        counts = [0] * (len(col_edges) + 1)
+        for v in values:
+            counts[bisect_right(col_edges, v)] += 1
+        edges.append(col_edges)
+        reference.append([c / len(values) for c in counts])
+    return {"features": list(features), "edges": edges, "reference": reference}
+
+class DriftMonitor:
+    """Онлайн-монитор распределения признаков
+
+    Окно window_seconds разбито на n_buckets корзин; в каждой корзине
+    для каждого признака хранится гистограмма по бинам и в последней
+    ячейке — число нечисловых значений (NaN, ±inf).
+    """
+
+    def __init__(self, features, edges, reference, window_seconds=None, n_buckets=None, interval=None):
+        self.features = list(features)
+        self.edges = edges
+        self.reference = reference
+        self.window_seconds = window_seconds or _float_env(WINDOW_ENV, DEFAULT_WINDOW_SECONDS)
+        self.n_buckets = int(n_buckets or _float_env(BUCKETS_ENV, DEFAULT_BUCKETS))
+        self.interval = interval or _float_env(INTERVAL_ENV, DEFAULT_INTERVAL)
+        self.bucket_seconds = self.window_seconds / self.n_buckets
+
+        self._counts = [[[0] * (len(e) + 2) for e in edges] for _ in range(self.n_buckets)]
+        self._bucket_ids = [None] * self.n_buckets
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.latest = {"status": "collecting", "features": {}}
+
+    @classmethod
+    def from_reference(cls, reference, **kwargs):
+        """Монитор по сохраненному результату compute_reference"""
+        return cls(reference["features"], reference["edges"], reference["reference"], **kwargs)
+
+    def observe(self, values):
+        """Учет одного запроса: O(число признаков * log числа бинов)"""
+        bucket_id = int(time.monotonic() // self.bucket_seconds)
+        slot = bucket_id % self.n_buckets
+        with self._lock:
+            counts = self._counts[slot]
+            if self._bucket_ids[slot] != bucket_id:
+                # Корзина устарела — обнуляем ее для нового интервала
+                for hist in counts:
+                    hist[:] = [0] * len(hist)
+                self._bucket_ids[slot] = bucket_id
+            for hist, col_edges, value in zip(counts, self.edges, values):
+                if math.isfinite(value):
+                    hist[bisect_right(col_edges, value)] += 1
+                else:
+                    hist[-1] += 1
+
+    def window_counts(self):
+        """Суммарные гистограммы по актуальным корзинам окна"""
+        oldest = int(time.monotonic() // self.bucket_seconds) - self.n_buckets + 1
+        with self._lock:
+            totals = [[0] * len(hist) for hist in self._counts[0]]
+            for bucket_id, counts in zip(self._bucket_ids, self._counts):
+                if bucket_id is None or bucket_id < oldest:
+                    continue
+                for total, hist in zip(totals, counts):
+                    for i, c in enumerate(hist):
+                        total[i] += c
+        return totals
+
+    def compute(self):
+        """Расчет PSI и KS по текущему окну"""
+        totals = self.window_counts()
+        observations = sum(totals[0]) if totals else 0
+        features = {}
+        for col, expected, hist in zip(self.features, self.reference, totals):
+            finite = sum(hist[:-1])
+            # На малой выборке PSI — шум: оценки не публикуются
+            if finite < MIN_OBSERVATIONS:
+                features[col] = {"observations": finite, "status": "collecting"}
+                continue
+            actual = [c / finite for c in hist[:-1]]
+            score = psi(expected, actual)
+            features[col] = {
+                "observations": finite,
+                "psi": round(score, 4),
+                "ks": round(ks_statistic(expected, actual), 4),
+                "status": psi_status(score)
+            }
+
+        if all(f["status"] == "collecting" for f in features.values()):
+            status = "collecting"
+        elif any(f["status"] == "drift" for f in features.values()):
+            status = "drift"
+        elif any(f["status"] == "warning" for f in features.values()):
+            status = "warning"
+        else:
+            status = "stable"
+
+        self.latest = {
+            "status": status,
+            "observations": observations,
+            "non_finite": {col: hist[-1] for col, hist in zip(self.features, totals)},
+            "window_seconds": self.window_seconds,
+            "computed_at": time.time(),
+            "features": features
+        }
+        return self.latest
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.compute()
+
+    def start(self):
+        """Запуск фонового пересчета метрик дрейфа"""
+        self._thread = threading.Thread(target=self._run, name='drift-monitor', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
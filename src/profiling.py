@@ -0,0 +1,260 @@
+"""
+Профилирование этапов пайплайна и запросов API
+Простой сэмплирующий профайлер на стандартной библиотеке.
+
+Включается переменной окружения ML_PROFILE=1 (или флагом --profile у run_all.py
+и api.py). Когда режим выключен, main() модулей вызывается напрямую,
+а middleware API не регистрируется — накладных расходов нет.
+
+Результаты пишутся в reports/profiles/:
+    <этап>.collapsed     — стеки в формате collapsed (flamegraph.pl, speedscope)
+    <этап>_summary.txt   — топ горячих точек (собственное и полное время)
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+# Переменные окружения
+PROFILE_ENV = 'ML_PROFILE'
+INTERVAL_ENV = 'ML_PROFILE_INTERVAL'
+SAMPLE_RATE_ENV = 'ML_PROFILE_SAMPLE_RATE'
+
+# Значения по умолчанию
+DEFAULT_INTERVAL = 0.005  # секунд между сэмплами
+DEFAULT_SAMPLE_RATE = 0.1  # доля профилируемых запросов API
+FLUSH_INTERVAL = 10.0  # секунд между записями профилей API на диск
+TOP_N = 15
+
+# Листовые кадры простаивающего цикла событий
+IDLE_FRAMES = ('selectors.py:select', 'selectors.py:poll')
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILES_DIR = os.path.join(project_root, 'reports', 'profiles')
+
+def is_enabled():
+    """Включен ли режим профилирования"""
+    return os.environ.get(PROFILE_ENV, '').lower() not in ('', '0', 'false', 'no')
+
+def enable():
+    """Включение профилирования (наследуется дочерними процессами)"""
+    os.environ[PROFILE_ENV] = '1'
+
+def _float_env(name, default):
+    """Чтение числового параметра из переменной окружения"""
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+def sample_interval():
+    """Интервал между сэмплами стека в секундах"""
+    return _float_env(INTERVAL_ENV, DEFAULT_INTERVAL)
+
+def request_sample_rate():
+    """Доля запросов API, которые профилируются"""
+    return _float_env(SAMPLE_RATE_ENV, DEFAULT_SAMPLE_RATE)
+
+def code_label(code):
+    """Короткое имя функции: пакет/модуль.py:функция"""
+    path = code.co_filename.replace('\\', '/')
+    # Для библиотек оставляем путь относительно site-packages
+    marker = 'site-packages/'
+    if marker in path:
+        path = path.split(marker, 1)[1]
+    elif path.startswith(project_root.replace('\\', '/')):
+        path = path[len(project_root) + 1:]
+    else:
+        path = os.path.basename(path)
+    # ';' — разделитель кадров в формате collapsed
+    return f"{path}:{code.co_name}".replace(';', ',')
+
+def _frame_label(frame):
+    """Короткое имя кадра стека"""
+    return code_label(frame.f_code)
+
+class SamplingProfiler:
+    """Сэмплирующий профайлер одного потока
+
+    Фоновый поток с заданным интервалом снимает стек целевого потока
+    через sys._current_frames() и считает одинаковые стеки.
+    """
+
+    def __init__(self, interval=None, thread_id=None):
+        self.interval = interval if interval is not None else sample_interval()
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+    def _take_sample(self):
+        """Снимок стека целевого потока"""
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            stack.append(_frame_label(frame))
+            frame = frame.f_back
+        if stack:
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._take_sample()
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started_at
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+def top_hotspots(stacks, top=TOP_N):
+    """Топ функций по собственному и полному числу сэмплов"""
+    self_counts = Counter()
+    total_counts = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        self_counts[frames[-1]] += count
+        # Рекурсивные вызовы учитываем в полном времени один раз
+        for label in set(frames):
+            total_counts[label] += count
+    return self_counts.most_common(top), total_counts.most_common(top)
+
+def write_profile(name, stacks, duration=None, output_dir=PROFILES_DIR):
+    """Сохранение collapsed-стеков и сводки горячих точек"""
+    os.makedirs(output_dir, exist_ok=True)
+    collapsed_path = os.path.join(output_dir, f"{name}.collapsed")
+    summary_path = os.path.join(output_dir, f"{name}_summary.txt")
+
+    with open(collapsed_path, 'w', encoding='utf-8') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+    total = sum(stacks.values())
+    self_top, total_top = top_hotspots(stacks)
+
+    lines = [f"ПРОФИЛЬ: {name}", "=" * 40, ""]
+    if duration is not None:
+        lines.append(f"Время выполнения: {duration:.3f} с")
+    lines.append(f"Сэмплов: {total}")
+    lines.append("")
+    for title, rows in (("СОБСТВЕННОЕ ВРЕМЯ", self_top), ("ПОЛНОЕ ВРЕМЯ (с вызовами)", total_top)):
+        lines.append(f"{title}:")
+        lines.append("-" * 30)
+        for label, count in rows:
+            share = count / total * 100 if total else 0.0
+            lines.append(f"{share:6.1f}%  {count:6d}  {label}")
+        lines.append("")
+
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+
+    return collapsed_path, summary_path
+
+def run_profiled(name, func, *args, **kwargs):
+    """Запуск функции (обычно main() модуля) под профайлером
+
+    Если профилирование выключено, функция просто вызывается.
+    """
+    if not is_enabled():
+        return func(*args, **kwargs)
+
+    profiler = SamplingProfiler()
+    with profiler:
+        result = func(*args, **kwargs)
+
+    collapsed_path, summary_path = write_profile(name, profiler.stacks, profiler.duration)
+    self_top, _ = top_hotspots(profiler.stacks, top=5)
+
+    print(f"\n⏱️  Профиль {name}: {profiler.duration:.2f} с, сэмплов: {profiler.samples}")
+    for label, count in self_top:
+        print(f"   {count / max(profiler.samples, 1) * 100:5.1f}%  {label}")
+    print(f"✅ Профиль сохранен: {collapsed_path}")
+    print(f"✅ Сводка сохранена: {summary_path}")
+
+    return result
+
+class RequestProfiler:
+    """Профилирование выборки запросов API
+
+    Стеки копятся в памяти по каждому эндпоинту; фоновый поток раз
+    в FLUSH_INTERVAL секунд (и при остановке) пишет api_<эндпоинт>.collapsed.
+
+    Ограничение: сэмплируется поток цикла событий целиком, поэтому в профиль
+    запроса попадает и работа параллельных запросов. Если обработчик
+    эндпоинта известен, сохраняются только стеки, содержащие его кадр;
+    иначе отбрасываются сэмплы простаивающего цикла (select).
+    """
+
+    def __init__(self, sample_rate=None, interval=None, flush_interval=FLUSH_INTERVAL):
+        self.sample_rate = sample_rate if sample_rate is not None else request_sample_rate()
+        self.interval = interval if interval is not None else sample_interval()
+        self.flush_interval = flush_interval
+        self.stacks = {}
+        self.durations = Counter()
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def should_sample(self):
+        return random.random() < self.sample_rate
+
+    def record(self, endpoint, profiler, handler=None):
+        """Добавление профиля одного запроса к профилю эндпоинта (только в памяти)"""
+        name = 'api_' + (endpoint.strip('/').replace('/', '_') or 'root')
+        if handler is not None:
+            handler = getattr(handler, '__wrapped__', handler)
+            label = code_label(handler.__code__)
+            stacks = {s: c for s, c in profiler.stacks.items() if label in s.split(';')}
+        else:
+            stacks = {s: c for s, c in profiler.stacks.items()
+                      if s.rsplit(';', 1)[-1] not in IDLE_FRAMES}
+        with self._lock:
+            self.stacks.setdefault(name, Counter()).update(stacks)
+            self.durations[name] += profiler.duration
+            self._dirty.add(name)
+
+    def flush(self):
+        """Запись накопленных профилей измененных эндпоинтов"""
+        with self._lock:
+            snapshot = [(name, Counter(self.stacks[name]), self.durations[name]) for name in self._dirty]
+            self._dirty.clear()
+        for name, stacks, duration in snapshot:
+            write_profile(name, stacks, duration)
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def start(self):
+        """Запуск фоновой записи профилей"""
+        self._thread = threading.Thread(target=self._run, name='profile-flush', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Остановка фоновой записи с финальным сбросом на диск"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
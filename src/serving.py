@@ -0,0 +1,373 @@
+"""
+Обслуживание нескольких моделей: A/B-маршрутизация и теневые модели
+Конфигурация в models/serving.json (путь меняется через ML_SERVING_CONFIG):
+
+    {
+        "models": {
+            "primary":   {"path": "models/model.pkl",     "weight": 0.9},
+            "candidate": {"path": "models/candidate.pkl", "weight": 0.1},
+            "shadow":    {"path": "models/shadow.pkl",    "weight": 0}
+        },
+        "default": "primary",
+        "shadow": ["shadow"]
+    }
+
+Без файла конфигурации обслуживается одна модель models/model.pkl.
+Модели с весом > 0 отвечают на долю запросов пропорционально весу.
+Теневые модели считают предсказание в отдельном процессе (spawn), поэтому
+не конкурируют с обработкой запросов за GIL; совпадение считается всегда
+с моделью по умолчанию ("default"). Процессу нужно свободное ядро CPU.
+Предсказания, совпадения и задержки пишутся в reports/serving/predictions.log
+(ротация по размеру) через очередь, без файлового I/O на пути запроса.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import multiprocessing
+import threading
+import time
+import uuid
+import warnings
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Переменные окружения
+CONFIG_ENV = 'ML_SERVING_CONFIG'
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(project_root, 'models', 'serving.json')
+LOG_PATH = os.path.join(project_root, 'reports', 'serving', 'predictions.log')
+DEFAULT_CONFIG = {
+    "models": {"primary": {"path": os.path.join('models', 'model.pkl'), "weight": 1.0}},
+    "default": "primary",
+    "shadow": []
+}
+
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LATENCY_WINDOW = 1000  # последних замеров задержки на модель
+FEATURE_NAMES_WARNING = 'X does not have valid feature names'
+MAX_PENDING_SHADOW = 100  # при большей очереди теневые запросы пропускаются
+SHADOW_RESTART_SECONDS = 60.0  # пауза перед перезапуском упавшего теневого процесса
+
+# Модели теневого процесса (заполняются в _init_shadow_worker)
+_worker_models = {}
+
+def load_config(path=None):
+    """Чтение конфигурации моделей (или конфигурация по умолчанию)"""
+    path = path or os.environ.get(CONFIG_ENV, CONFIG_PATH)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return DEFAULT_CONFIG
+
+def check_feature_order(model, features):
+    """Проверка, что модель обучена на признаках в порядке features
+
+    Тогда numpy-массив в этом порядке эквивалентен DataFrame с колонками.
+    """
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None and list(names) != list(features):
+        raise ValueError(f"Порядок признаков модели {list(names)} не совпадает с {list(features)}")
+
+def score(model, input_data):
+    """Предсказание класса и вероятностей одним вызовом predict_proba
+
+    Порядок признаков проверен в check_feature_order, поэтому
+    предупреждение sklearn о массиве без имен колонок подавляется.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message=FEATURE_NAMES_WARNING)
+        proba = model.predict_proba(input_data)[0]
+    return int(model.classes_[proba.argmax()]), proba.tolist()
+
+def _init_shadow_worker(paths, features):
+    """Загрузка моделей в теневом процессе"""
+    import joblib
+    # Минимальный приоритет: при нехватке ядер CPU отдается обработке запросов
+    if hasattr(os, 'nice'):
+        os.nice(19)
+    warnings.filterwarnings('ignore', message='Trying to unpickle')
+    for name, path in paths.items():
+        model = joblib.load(path)
+        check_feature_order(model, features)
+        _worker_models[name] = model
+
+def _score_shadow(names, input_data):
+    """Предсказания теневого процесса: {имя: (класс, вероятности, задержка) или None}"""
+    results = {}
+    for name in names:
+        started = time.perf_counter()
+        try:
+            prediction, probability = score(_worker_models[name], input_data)
+        except Exception:
+            results[name] = None
+            continue
+        results[name] = (prediction, probability, time.perf_counter() - started)
+    return results
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+class RoleStats:
+    """Счетчики модели в одной роли (served или shadow)"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.compared = 0
+        self.agreed = 0
+        self.dropped = 0
+
+    def to_dict(self):
+        latencies = list(self.latencies)
+        result = {"requests": self.requests, "errors": self.errors, "dropped": self.dropped}
+        if latencies:
+            result["latency_ms"] = {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 3),
+                "p50": round(_percentile(latencies, 0.5) * 1000, 3),
+                "p95": round(_percentile(latencies, 0.95) * 1000, 3)
+            }
+        if self.compared:
+            result["agreement_with_default"] = round(self.agreed / self.compared, 4)
+        return result
+
+class ModelRegistry:
+    """Набор именованных моделей с маршрутизацией трафика"""
+
+    def __init__(self, models, weights, default, shadows, paths=None, features=None, log_path=LOG_PATH):
+        self.models = models
+        self.default = default
+        self.weights = {name: w for name, w in weights.items() if w > 0 and name in models}
+        self.shadows = [name for name in shadows if name in models and name != default]
+        self.stats = {name: {"served": RoleStats(), "shadow": RoleStats()} for name in models}
+        self._names = list(self.weights)
+        self._cumulative = []
+        total = 0.0
+        for name in self._names:
+            total += self.weights[name]
+            self._cumulative.append(total)
+        self._lock = threading.Lock()
+        self._pending_shadow = 0
+        self._executor = None
+        self._broken_at = None
+        self._worker_args = None
+        if self.shadows and default not in models:
+            print(f"⚠️  Модель по умолчанию {default} не загружена, теневые модели отключены")
+            self.shadows = []
+        if self.shadows and paths:
+            # В теневом процессе нужны теневые модели и модель по умолчанию для сравнения
+            worker_paths = {name: paths[name] for name in self.shadows + [default]}
+            self._worker_args = (worker_paths, features or [])
+            self._start_executor()
+        self._logger, self._listener = self._create_logger(log_path)
+
+    def _start_executor(self):
+        """Запуск теневого процесса; модели загружаются сразу, а не на первом запросе"""
+        self._executor = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_shadow_worker, initargs=self._worker_args
+        )
+        self._broken_at = None
+        self._executor.submit(_score_shadow, [], None)
+
+    def _mark_broken(self, executor):
+        """Отключение сломанного пула; перезапуск через SHADOW_RESTART_SECONDS"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self._broken_at = time.monotonic()
+        executor.shutdown(wait=False, cancel_futures=True)
+        print("⚠️  Теневой процесс недоступен, теневые предсказания приостановлены")
+
+    def _count_shadow(self, served_name, field):
+        """Увеличение счетчика (errors / dropped) у всех теневых моделей запроса"""
+        with self._lock:
+            for name in self.shadows:
+                if name != served_name:
+                    stats = self.stats[name]["shadow"]
+                    setattr(stats, field, getattr(stats, field) + 1)
+
+    @classmethod
+    def from_config(cls, config=None, loader=None, features=None, log_path=LOG_PATH):
+        """Загрузка моделей по конфигурации; отсутствующие файлы пропускаются"""
+        if loader is None:
+            import joblib
+            loader = joblib.load
+        config = config or load_config()
+        models = {}
+        weights = {}
+        paths = {}
+        for name, spec in config["models"].items():
+            path = os.path.join(project_root, spec["path"])
+            try:
+                models[name] = loader(path)
+            except FileNotFoundError:
+                print(f"⚠️  Модель {name} не найдена: {spec['path']}")
+                continue
+            weights[name] = float(spec.get("weight", 0))
+            paths[name] = path
+        default = config.get("default", next(iter(config["models"])))
+        return cls(models, weights, default, config.get("shadow", []), paths, features, log_path)
+
+    @staticmethod
+    def _create_logger(log_path):
+        """Логгер с ротацией; запись в файл идет в потоке QueueListener"""
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+        file_handler.setFormatter(logging.Formatter('%(message)s'))
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, file_handler)
+        listener.start()
+
+        logger = logging.getLogger(f'ml.serving.{id(log_queue)}')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        return logger, listener
+
+    def choose(self):
+        """Выбор модели для запроса пропорционально весам"""
+        if not self._names:
+            return self.default
+        point = random.random() * self._cumulative[-1]
+        for name, bound in zip(self._names, self._cumulative):
+            if point < bound:
+                return name
+        return self._names[-1]
+
+    def _log(self, **record):
+        self._logger.info(json.dumps(record, ensure_ascii=False))
+
+    def predict(self, name, input_data):
+        """Предсказание выбранной моделью с учетом задержки"""
+        stats = self.stats[name]["served"]
+        started = time.perf_counter()
+        try:
+            prediction, probability = score(self.models[name], input_data)
+        except Exception:
+            with self._lock:
+                stats.errors += 1
+            raise
+        latency = time.perf_counter() - started
+        with self._lock:
+            stats.requests += 1
+            stats.latencies.append(latency)
+
+        request_id = uuid.uuid4().hex
+        self._log(ts=time.time(), request_id=request_id, model=name, role="served",
+                  prediction=prediction, probability=probability,
+                  latency_ms=round(latency * 1000, 3))
+        self.submit_shadow(request_id, name, prediction, input_data)
+        return prediction, probability
+
+    def submit_shadow(self, request_id, served_name, served_prediction, input_data):
+        """Отправка запроса теневым моделям в отдельный процесс
+
+        Ошибки теневого процесса не влияют на ответ основной модели.
+        """
+        if not self.shadows or self._worker_args is None:
+            return
+        if self._executor is None:
+            if time.monotonic() - self._broken_at < SHADOW_RESTART_SECONDS:
+                self._count_shadow(served_name, "dropped")
+                return
+            try:
+                self._start_executor()
+            except Exception:
+                self._broken_at = time.monotonic()
+                self._count_shadow(served_name, "errors")
+                return
+        with self._lock:
+            if self._pending_shadow >= MAX_PENDING_SHADOW:
+                pending_full = True
+            else:
+                pending_full = False
+                self._pending_shadow += 1
+        if pending_full:
+            self._count_shadow(served_name, "dropped")
+            return
+        # Эталон для сравнения — модель по умолчанию; если ответила она, пересчет не нужен
+        default_prediction = served_prediction if served_name == self.default else None
+        names = [n for n in self.shadows if n != served_name]
+        if default_prediction is None:
+            names.append(self.default)
+        executor = self._executor
+        try:
+            future = executor.submit(_score_shadow, names, input_data)
+        except Exception:
+            with self._lock:
+                self._pending_shadow -= 1
+            self._count_shadow(served_name, "errors")
+            self._mark_broken(executor)
+            return
+        future.add_done_callback(
+            lambda f: self._finish_shadow(f, executor, request_id, served_name, default_prediction)
+        )
+
+    def _finish_shadow(self, future, executor, request_id, served_name, default_prediction):
+        """Учет результатов теневого процесса (поток обратных вызовов пула)"""
+        try:
+            results = future.result()
+        except BrokenProcessPool:
+            results = {}
+            self._mark_broken(executor)
+        except (Exception, CancelledError):
+            results = {}
+        with self._lock:
+            self._pending_shadow -= 1
+        if default_prediction is None:
+            default_result = results.pop(self.default, None)
+            default_prediction = default_result[0] if default_result else None
+        for name in self.shadows:
+            if name == served_name:
+                continue
+            stats = self.stats[name]["shadow"]
+            result = results.get(name)
+            if result is None:
+                with self._lock:
+                    stats.errors += 1
+                continue
+            prediction, probability, latency = result
+            agrees = prediction == default_prediction if default_prediction is not None else None
+            with self._lock:
+                stats.requests += 1
+                stats.latencies.append(latency)
+                if agrees is not None:
+                    stats.compared += 1
+                    stats.agreed += agrees
+            self._log(ts=time.time(), request_id=request_id, model=name, role="shadow",
+                      served_model=served_name, default_model=self.default,
+                      prediction=prediction, probability=probability,
+                      agrees_with_default=agrees, latency_ms=round(latency * 1000, 3))
+
+    def summary(self):
+        """Конфигурация маршрутизации и статистика по моделям и ролям"""
+        total = self._cumulative[-1] if self._cumulative else 0.0
+        with self._lock:
+            models = {
+                name: {role: stats.to_dict() for role, stats in roles.items()}
+                for name, roles in self.stats.items()
+            }
+        return {
+            "default": self.default,
+            "traffic": {name: round(self.weights[name] / total, 4) for name in self._names},
+            "shadow": self.shadows,
+            "models": models
+        }
+
+    def close(self):
+        """Завершение теневого процесса и сброс лога"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self._listener.stop()